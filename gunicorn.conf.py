@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for the LinkedIn Image Processor.
+
+Start with: gunicorn app:app
+(gunicorn picks this file up automatically from the working directory)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# One worker process per core
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# JPEG decode/resize/encode runs in each worker's process pool (see
+# app.get_process_pool); split the cores between workers so the pools
+# together use about one process per core instead of workers x cores
+os.environ.setdefault(
+    'PROCESS_POOL_WORKERS', str(max(1, multiprocessing.cpu_count() // workers))
+)
+
+# With the CPU work in the pool, request threads mostly wait on LinkedIn
+# downloads, so each worker can keep several in flight
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Import the app (and warm up the JPEG codec, see WARMUP) once in the master;
+# workers then share that memory copy-on-write after fork
+preload_app = True
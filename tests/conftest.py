@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# app.py reads its configuration and creates its folders at import time
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='lip-tests-'))
+os.environ.setdefault('WARMUP', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
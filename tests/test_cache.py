@@ -0,0 +1,141 @@
+import json
+import os
+import time
+
+import pytest
+
+import app
+
+
+RESULT = {'success': True, 'file_size': 5, 'filename': 'out.jpg'}
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / 'out.jpg'
+    path.write_bytes(b'12345')
+    return str(path)
+
+
+@pytest.fixture
+def url_cache_path(tmp_path):
+    return str(tmp_path / 'url.json')
+
+
+def test_url_cache_round_trip(output, url_cache_path):
+    app.save_url_cache(url_cache_path, output, RESULT)
+    assert app.load_url_cache(url_cache_path, output) == RESULT
+
+
+def test_url_cache_expires_from_saved_at(output, url_cache_path, monkeypatch):
+    monkeypatch.setattr(app, 'CACHE_TTL_SECONDS', 60)
+    app.save_url_cache(url_cache_path, output, RESULT)
+    with open(url_cache_path) as f:
+        entry = json.load(f)
+    entry['saved_at'] -= 61
+    with open(url_cache_path, 'w') as f:
+        json.dump(entry, f)
+
+    assert app.load_url_cache(url_cache_path, output) is None
+
+
+def test_url_cache_ignores_old_file_mtime(output, url_cache_path, monkeypatch):
+    # A published hard link keeps the content-cache entry's mtime, which can
+    # be far older than the URL result itself
+    monkeypatch.setattr(app, 'CACHE_TTL_SECONDS', 60)
+    old = time.time() - 3600
+    os.utime(output, (old, old))
+    app.save_url_cache(url_cache_path, output, RESULT)
+
+    assert app.load_url_cache(url_cache_path, output) == RESULT
+
+
+def test_url_cache_entry_without_saved_at_is_expired(output, url_cache_path):
+    entry = {'mtime_ns': os.stat(output).st_mtime_ns, 'result': RESULT}
+    with open(url_cache_path, 'w') as f:
+        json.dump(entry, f)
+
+    assert app.load_url_cache(url_cache_path, output) is None
+
+
+def test_url_cache_misses_when_file_changes(output, url_cache_path):
+    app.save_url_cache(url_cache_path, output, RESULT)
+    stat = os.stat(output)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert app.load_url_cache(url_cache_path, output) is None
+
+    app.save_url_cache(url_cache_path, output, RESULT)
+    with open(output, 'ab') as f:
+        f.write(b'6')
+    assert app.load_url_cache(url_cache_path, output) is None
+
+
+def test_url_cache_misses_when_file_is_gone(output, url_cache_path):
+    app.save_url_cache(url_cache_path, output, RESULT)
+    os.unlink(output)
+    assert app.load_url_cache(url_cache_path, output) is None
+
+
+def test_url_cache_disabled_by_zero_ttl(output, url_cache_path, monkeypatch):
+    monkeypatch.setattr(app, 'CACHE_TTL_SECONDS', 0)
+    app.save_url_cache(url_cache_path, output, RESULT)
+    assert not os.path.exists(url_cache_path)
+
+    monkeypatch.setattr(app, 'CACHE_TTL_SECONDS', 60)
+    app.save_url_cache(url_cache_path, output, RESULT)
+    monkeypatch.setattr(app, 'CACHE_TTL_SECONDS', 0)
+    assert app.load_url_cache(url_cache_path, output) is None
+
+
+def test_cache_keys_split_on_progressive():
+    digest = app.source_digest(b'source')
+    assert app.content_cache_key(digest, True) != app.content_cache_key(digest, False)
+    assert app.url_cache_key('https://x/a.jpg', 'a', True) != app.url_cache_key('https://x/a.jpg', 'a', False)
+
+
+def test_cache_keys_split_on_encoder():
+    digest = app.source_digest(b'source')
+    assert app.content_cache_key(digest, encoder='pillow') != app.content_cache_key(digest, encoder='cjpegli')
+
+
+def test_publish_file_hard_links(tmp_path):
+    src = tmp_path / 'src.jpg'
+    src.write_bytes(b'jpeg bytes')
+    dst = tmp_path / 'out' / 'dst.jpg'
+    dst.parent.mkdir()
+
+    app.publish_file(str(src), str(dst))
+
+    assert os.path.samefile(src, dst)
+    assert list(dst.parent.iterdir()) == [dst]
+
+
+def test_publish_file_copies_when_link_fails(tmp_path, monkeypatch):
+    def no_link(src, dst):
+        raise OSError(18, 'Invalid cross-device link')
+
+    monkeypatch.setattr(app.os, 'link', no_link)
+    src = tmp_path / 'src.jpg'
+    src.write_bytes(b'jpeg bytes')
+    dst = tmp_path / 'out' / 'dst.jpg'
+    dst.parent.mkdir()
+    dst.write_bytes(b'previous')
+
+    old_umask = os.umask(0o077)
+    try:
+        app.publish_file(str(src), str(dst))
+    finally:
+        os.umask(old_umask)
+
+    assert dst.read_bytes() == b'jpeg bytes'
+    assert not os.path.samefile(src, dst)
+    assert dst.stat().st_mode & 0o777 == 0o644
+    assert list(dst.parent.iterdir()) == [dst]
+
+
+def test_publish_file_cleans_up_on_failure(tmp_path):
+    out = tmp_path / 'out'
+    out.mkdir()
+    with pytest.raises(OSError):
+        app.publish_file(str(tmp_path / 'missing.jpg'), str(out / 'dst.jpg'))
+    assert list(out.iterdir()) == []
@@ -0,0 +1,87 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import app
+
+
+SIZES = [(1, 1), (17, 9), (640, 480), (1280, 720), (3000, 200), (201, 4001)]
+
+
+def encode(size, fmt, mode='RGB', **save_args):
+    buf = BytesIO()
+    Image.new(mode, size, 'red' if mode != '1' else 1).save(buf, fmt, **save_args)
+    return buf.getvalue()
+
+
+def pillow_size(data):
+    with Image.open(BytesIO(data)) as img:
+        return img.size
+
+
+SAMPLES = (
+    [pytest.param(encode(s, 'JPEG'), id=f'jpeg-{s[0]}x{s[1]}') for s in SIZES]
+    + [
+        pytest.param(encode((640, 480), 'JPEG', 'L'), id='jpeg-grey'),
+        pytest.param(encode((640, 480), 'JPEG', 'CMYK'), id='jpeg-cmyk'),
+        pytest.param(encode((640, 480), 'JPEG', progressive=True), id='jpeg-progressive'),
+        pytest.param(encode((641, 479), 'JPEG', subsampling=0), id='jpeg-444'),
+        pytest.param(encode((640, 480), 'JPEG', exif=b'Exif\x00\x00' + b'\x00' * 4000), id='jpeg-exif'),
+    ]
+    + [pytest.param(encode(s, 'PNG'), id=f'png-{s[0]}x{s[1]}') for s in SIZES]
+    + [
+        pytest.param(encode((300, 200), 'PNG', 'RGBA'), id='png-rgba'),
+        pytest.param(encode((300, 200), 'PNG', 'P'), id='png-palette'),
+    ]
+    + [pytest.param(encode(s, 'GIF'), id=f'gif-{s[0]}x{s[1]}') for s in SIZES]
+    + [pytest.param(encode(s, 'WEBP'), id=f'webp-lossy-{s[0]}x{s[1]}') for s in SIZES]
+    + [pytest.param(encode(s, 'WEBP', lossless=True), id=f'webp-lossless-{s[0]}x{s[1]}') for s in SIZES]
+    + [
+        pytest.param(encode((300, 200), 'WEBP', 'RGBA'), id='webp-alpha'),
+        pytest.param(encode((16383, 2), 'WEBP'), id='webp-max-width'),
+    ]
+)
+
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_matches_pillow(data):
+    assert app.peek_dimensions(data) == pillow_size(data)
+
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_truncated_header_is_none_or_correct(data):
+    # A prefix may be too short to answer, but must never give a wrong size
+    expected = pillow_size(data)
+    for n in range(0, min(len(data), 700)):
+        assert app.peek_dimensions(data[:n]) in (None, expected)
+
+
+def test_jpeg_sof_past_first_64kb():
+    # A large ICC profile is written as several APP2 segments ahead of SOF
+    data = encode((800, 600), 'JPEG', icc_profile=b'\x00' * 200_000)
+    assert data.index(b'\xff\xc0') > 65536
+
+    assert app.peek_dimensions(data) == (800, 600)
+    # download_linkedin_image() only peeks at the first 64KB: no answer
+    # there, so the pixel check is left to the full-download pass
+    assert app.peek_dimensions(data[:65536]) is None
+    assert app.image_dimensions(data) == (800, 600)
+
+
+@pytest.mark.parametrize('data', [b'', b'not an image', b'\xff\xd8\x00\x00' * 8, b'RIFF\x00\x00\x00\x00WEBP'])
+def test_unrecognised_is_none(data):
+    assert app.peek_dimensions(data) is None
+
+
+def test_image_dimensions_falls_back_to_pillow():
+    data = encode((123, 45), 'BMP')
+    assert app.peek_dimensions(data) is None
+    assert app.image_dimensions(data) == (123, 45)
+
+
+def test_check_source_pixels():
+    app.check_source_pixels(None)
+    app.check_source_pixels((app.MAX_SOURCE_PIXELS, 1))
+    with pytest.raises(Exception, match='Image too large'):
+        app.check_source_pixels((app.MAX_SOURCE_PIXELS + 1, 1))